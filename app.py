@@ -1,22 +1,44 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context, g
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from datetime import datetime
 import os
+import re
 import csv
-from io import StringIO, BytesIO
+import time
+import itertools
 import json
-from dateutil.relativedelta import relativedelta
+from sqlalchemy import Index, func, case, inspect, select, text
 
-from models import db, Task, AppSettings, User, create_default_admin
+from models import db, Task, TaskActionHistory, AppSettings, User, create_default_admin
+from sqlalchemy.orm import selectinload
 from config import get_config
 import secrets
-from datetime import datetime, timedelta
+import functools
+from datetime import datetime, timedelta, date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Initialize Flask app with configuration
 app = Flask(__name__)
 config_class = get_config()
 app.config.from_object(config_class)
 
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class ORJSONProvider(JSONProvider):
+        """JSON provider backed by orjson - C-accelerated serialization for
+        every jsonify() response and request.json parse"""
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
+
 # Initialize database
 db.init_app(app)
 
@@ -29,12 +51,19 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cache the loaded user on flask.g for the request; session.get also
+    # consults the identity map before touching the database
+    user_id = int(user_id)
+    user = getattr(g, '_loaded_user', None)
+    if user is not None and user.id == user_id:
+        return user
+    user = db.session.get(User, user_id)
+    g._loaded_user = user
+    return user
 
 # Admin-only decorator
 def admin_required(f):
-    from functools import wraps
-    @wraps(f)
+    @functools.wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or not current_user.is_admin:
             flash('Access denied. Admin privileges required.', 'error')
@@ -52,59 +81,134 @@ def verify_reset_token(token, max_age=3600):  # 1 hour expiry
     # In production, you'd want to store tokens in database with expiry
     return token and len(token) > 20  # Basic validation
 
-# Create database tables on app startup
+def _apply_schema_upgrades():
+    """Guarded one-time DDL for databases created before the current schema.
+    create_all only adds tables that are missing entirely, so indexes added
+    to the existing tasks table and the ON DELETE CASCADE foreign key never
+    reach an upgraded deployment without this step."""
+    inspector = inspect(db.engine)
+    existing = {ix['name'] for ix in inspector.get_indexes('tasks')}
+    for item in Task.__table_args__:
+        if isinstance(item, Index) and item.name not in existing:
+            item.create(db.engine)
+            print(f"✅ Created missing index {item.name}")
+
+    # SQLite cannot alter a foreign key in place and does not enforce them
+    # by default anyway; the explicit bulk deletes cover task children there
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as conn:
+        legacy_fk = conn.execute(text(
+            "SELECT con.conname FROM pg_constraint con "
+            "JOIN pg_class rel ON rel.oid = con.conrelid "
+            "WHERE rel.relname = 'tasks' AND con.contype = 'f' "
+            "AND con.confdeltype <> 'c'"
+        )).scalar()
+        if legacy_fk:
+            conn.execute(text(f'ALTER TABLE tasks DROP CONSTRAINT "{legacy_fk}"'))
+            conn.execute(text(
+                'ALTER TABLE tasks ADD CONSTRAINT tasks_user_id_fkey '
+                'FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE'))
+            print("✅ Upgraded tasks.user_id foreign key to ON DELETE CASCADE")
+
+# Make sure the schema and default admin exist on startup. create_all is a
+# no-op for tables that already exist - the previous drop_all here wiped all
+# user data on every restart and raced DDL across gunicorn workers.
 with app.app_context():
     try:
         db_url = app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')
-        print(f"Database URL: {db_url}")
-
-        # Drop and recreate tables if needed (for migration)
-        print("Dropping existing tables...")
-        db.drop_all()
-        print("Creating new tables...")
         db.create_all()
-
-        create_default_admin()  # Create default admin user
-        print("✅ Database tables initialized successfully")
-        print(f"✅ Connected to: {'PostgreSQL' if 'postgresql' in db_url else 'SQLite'}")
-        print("✅ Default admin user created")
+        _apply_schema_upgrades()
+        create_default_admin()
+        print(f"✅ Database ready ({'PostgreSQL' if 'postgresql' in db_url else 'SQLite'})")
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
         print(f"Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')}")
 
+@app.cli.command('reset-db')
+def reset_db_command():
+    """Drop and recreate all tables (destroys data - explicit opt-in only)"""
+    db.drop_all()
+    db.create_all()
+    create_default_admin()
+    print("Database reset.")
+
+# Common date formats to try, frozen at module scope so the parser does not
+# rebuild the list on every call
+_DATE_FORMATS = (
+    '%Y-%m-%d',      # 2025-05-12
+    '%d/%m/%Y',      # 12/05/2025
+    '%m/%d/%Y',      # 05/12/2025
+    '%d-%m-%Y',      # 12-05-2025
+    '%Y/%m/%d',      # 2025/05/12
+)
+
+# One regex that recognizes all supported numeric layouts (year-first or
+# year-last, - or / separator), so a single match replaces up to five
+# strptime attempts with their exception churn
+_DATE_RE = re.compile(
+    r'^(?:(\d{4})([-/])(\d{1,2})\2(\d{1,2})'       # 2025-05-12 / 2025/05/12
+    r'|(\d{1,2})([-/])(\d{1,2})\6(\d{4}))$'        # 12/05/2025 / 12-05-2025
+)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_cached(date_str):
+    """Parse a date string (memoized - the same date strings repeat heavily
+    across tasks, so each unique string is only parsed once)."""
+    # Fast path: ISO format (YYYY-MM-DD) is what the database returns
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return date.fromisoformat(date_str)
+        except ValueError:
+            pass
+
+    match = _DATE_RE.match(date_str)
+    if match:
+        if match.group(1):  # year first
+            try:
+                return date(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+            except ValueError:
+                return None
+        # Year last: prefer day-first, then month-first, matching the
+        # order the strptime format list used
+        first, second, year = int(match.group(5)), int(match.group(7)), int(match.group(8))
+        for day, month in ((first, second), (second, first)):
+            try:
+                return date(year, month, day)
+            except ValueError:
+                continue
+        return None
+
+    # Last resort for anything unusual (whitespace, odd separators, ...)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+
+    return None
+
 # Helper function to parse dates flexibly
 def parse_date_flexible(date_str):
     """Parse date string that could be in multiple formats"""
-    from datetime import datetime
     if not date_str:
         return None
 
-    # Common date formats to try
-    formats = [
-        '%Y-%m-%d',      # 2025-05-12
-        '%d/%m/%Y',      # 12/05/2025
-        '%m/%d/%Y',      # 05/12/2025
-        '%d-%m-%Y',      # 12-05-2025
-        '%Y/%m/%d',      # 2025/05/12
-    ]
+    # Already a date/datetime object - no parsing needed
+    if isinstance(date_str, datetime):
+        return date_str.date()
+    if isinstance(date_str, date):
+        return date_str
 
-    for fmt in formats:
+    # Excel sometimes stores dates as numbers (days since 1900-01-01)
+    if isinstance(date_str, (int, float)):
         try:
-            return datetime.strptime(str(date_str), fmt).date()
-        except ValueError:
-            continue
-
-    # If no format works, try to handle Excel date numbers
-    try:
-        # Excel sometimes stores dates as numbers (days since 1900-01-01)
-        if isinstance(date_str, (int, float)):
-            from datetime import datetime as dt, timedelta
-            excel_epoch = dt(1900, 1, 1)
+            excel_epoch = datetime(1900, 1, 1)
             return (excel_epoch + timedelta(days=int(date_str) - 2)).date()
-    except:
-        pass
+        except (ValueError, OverflowError):
+            return None
 
-    return None
+    return _parse_date_cached(str(date_str))
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -271,49 +375,81 @@ def admin_delete_user(user_id):
 
     user = User.query.get_or_404(user_id)
 
-    # Delete user's tasks first
-    Task.query.filter_by(user_id=user_id).delete()
-
-    # Delete user
+    # PostgreSQL cascades the task rows (and their history rows) via
+    # ON DELETE CASCADE; the explicit bulk deletes keep SQLite dev
+    # databases (no FK pragma) consistent and cost nothing when the
+    # cascade already removed them
+    user_task_ids = select(Task.id).where(Task.user_id == user_id)
+    TaskActionHistory.query.filter(
+        TaskActionHistory.task_id.in_(user_task_ids)
+    ).delete(synchronize_session=False)
+    Task.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     db.session.delete(user)
     db.session.commit()
+    _invalidate_analytics_cache(user_id)
 
     flash(f'User {user.username} deleted successfully', 'success')
     return redirect(url_for('manage_users'))
 
+# Page size for the index task list
+TASKS_PER_PAGE = 50
+
 # Load tasks from database
-def load_tasks():
-    """Load all active (non-deleted) tasks for current user"""
+def load_tasks(page=1, size=TASKS_PER_PAGE):
+    """Load one page of active (non-deleted) tasks for the current user.
+    Returns (tasks, has_next); fetching size + 1 rows answers has_next
+    without a separate COUNT query."""
     if current_user.is_authenticated:
-        tasks_db = Task.query.filter_by(user_id=current_user.id).filter(Task.status != "Deleted").all()
-        return [task.to_dict() for task in tasks_db]
-    return []
+        rows = db.session.execute(
+            select(Task).options(selectinload(Task.history_entries))
+            .where(Task.user_id == current_user.id,
+                   Task.status != "Deleted")
+            .order_by(Task.id)
+            .limit(size + 1).offset((page - 1) * size)
+        ).scalars().all()
+        today = datetime.today().date()
+        return [task.to_dict(today) for task in rows[:size]], len(rows) > size
+    return [], False
+
+# Iterate tasks lazily for routes that stream or render rows once
+def iter_tasks(batch_size=200):
+    """Yield active task dicts for the current user in database-side batches
+    instead of materializing the whole list"""
+    query = _active_tasks_query(
+        Task.query.options(selectinload(Task.history_entries))
+    ).yield_per(batch_size)
+    today = datetime.today().date()
+    return (task.to_dict(today) for task in query)
 
 # Load archived (deleted) tasks
-def load_archived_tasks():
-    """Load all deleted/archived tasks for current user"""
-    if current_user.is_authenticated:
-        tasks_db = Task.query.filter_by(user_id=current_user.id, status="Deleted").all()
-        return [task.to_dict() for task in tasks_db]
-    return []
+def iter_archived_tasks(batch_size=200):
+    """Yield deleted/archived task dicts for current user in batches"""
+    query = Task.query.options(selectinload(Task.history_entries)).filter_by(
+        user_id=current_user.id, status="Deleted").yield_per(batch_size)
+    today = datetime.today().date()
+    return (task.to_dict(today) for task in query)
+
+def _seed_task_seq():
+    """Highest numeric suffix among existing T-prefixed task ids; used once
+    to seed the task-id counter (and to re-seed it after a CSV import)"""
+    last = 0
+    for (task_id,) in db.session.query(Task.id).filter(Task.id.like('T%')):
+        try:
+            last = max(last, int(task_id[1:]))
+        except ValueError:
+            continue
+    return last
 
 # Save a new task to database
 def add_task(data):
     """Add a new task to the database"""
-    # Load current settings and custom columns
-    settings = load_settings()
-    custom_columns = [col['name'] for col in settings.get('custom_columns', [])]
+    custom_columns = custom_column_names()
 
-    # Auto-generate next ID
-    last_task = Task.query.order_by(Task.id.desc()).first()
-    if last_task and last_task.id.startswith('T'):
-        try:
-            last_num = int(last_task.id[1:])
-            next_id = f"T{last_num + 1:03d}"
-        except ValueError:
-            next_id = f"T{Task.query.count() + 1:03d}"
-    else:
-        next_id = f"T{Task.query.count() + 1:03d}"
+    # Auto-generate next ID from a persistent counter - one atomic UPDATE
+    # instead of scanning the table, and safe under concurrent inserts.
+    # (Ordering by the string id also sorted "T100" before "T99".)
+    seq = AppSettings.increment('next_task_seq', initial=_seed_task_seq)
+    next_id = f"T{seq:03d}"
 
     # Prepare custom fields
     custom_fields = {}
@@ -333,7 +469,6 @@ def add_task(data):
         created_date=parse_date_flexible(data.get('Created Date', datetime.today().strftime('%Y-%m-%d'))),
         due_date=parse_date_flexible(data.get('Due Date')),
         current_action_plan=data.get('Current Action Plan'),
-        action_plan_history=f"[{datetime.today().strftime('%Y-%m-%d')}]\n{data.get('Current Action Plan', '').strip()}" if data.get('Current Action Plan') else '',
         requester=data.get('Requester'),
         business_unit=data.get('Business Unit'),
         custom_fields=custom_fields if custom_fields else None,
@@ -341,7 +476,11 @@ def add_task(data):
     )
 
     db.session.add(task)
+    if data.get('Current Action Plan'):
+        db.session.add(TaskActionHistory(task_id=next_id,
+                                         entry=data['Current Action Plan'].strip()))
     db.session.commit()
+    _invalidate_analytics_cache(current_user.id)
 
 # Update action plan
 @app.route('/update_action_plan', methods=['POST'])
@@ -353,10 +492,9 @@ def update_action_plan():
     task = Task.query.filter_by(id=row_id, user_id=current_user.id).first()
     if task:
         task.current_action_plan = new_plan
-        history = task.action_plan_history or ''
-        timestamp = datetime.now().date().isoformat()
-        new_entry = f"[{timestamp}]\n{new_plan.strip()}\n"
-        task.action_plan_history = (new_entry + '\n' + history).strip()
+        # Append one history row instead of rewriting the whole history
+        # text - O(1) regardless of how long the history has grown
+        db.session.add(TaskActionHistory(task_id=row_id, entry=new_plan))
         db.session.commit()
         return jsonify({'status': 'success'})
 
@@ -371,18 +509,12 @@ def standup_update_action_plan():
 
     task = Task.query.filter_by(id=row_id, user_id=current_user.id).first()
     if task:
-        # Get current action plan to move to history
+        # Move current plan to history with a standup-flavoured entry
         current_plan = task.current_action_plan or ''
-        history = task.action_plan_history or ''
-
-        # Move current plan to history with standup timestamp
         if current_plan.strip():
-            timestamp = datetime.now().date().isoformat()
-            standup_entry = f"[STANDUP {timestamp}]\n{current_plan.strip()}\n"
-            if history:
-                task.action_plan_history = (standup_entry + '\n' + history).strip()
-            else:
-                task.action_plan_history = standup_entry.strip()
+            db.session.add(TaskActionHistory(task_id=row_id,
+                                             entry=current_plan.strip(),
+                                             kind='standup'))
 
         # Set new plan as current action plan
         task.current_action_plan = new_plan
@@ -410,13 +542,35 @@ def delete_task():
     if task:
         task.status = "Deleted"
         db.session.commit()
+        _invalidate_analytics_cache(current_user.id)
         return jsonify({'status': 'success'})
 
     return jsonify({'status': 'error', 'message': 'Task not found'})
 
+# In-process cache of the merged settings dict - settings change rarely but
+# index, add_task and edit_task all read them on every request. The custom
+# column name list is cached alongside so mutating routes don't rebuild it.
+_settings_cache = {'data': None, 'custom_columns': None}
+
+def _invalidate_settings_cache():
+    _settings_cache['data'] = None
+    _settings_cache['custom_columns'] = None
+
+def custom_column_names():
+    """Names of the configured custom columns, from the settings cache"""
+    names = _settings_cache['custom_columns']
+    if names is None:
+        names = [col['name'] for col in load_settings().get('custom_columns', [])]
+        _settings_cache['custom_columns'] = names
+    return names
+
 # Load settings from database
 def load_settings():
     """Load settings from database with defaults"""
+    cached = _settings_cache['data']
+    if cached is not None:
+        return cached
+
     settings = AppSettings.get_settings()
 
     # Set defaults if not found
@@ -428,22 +582,22 @@ def load_settings():
         'module_options': ['Authentication', 'Dashboard', 'Reports', 'Settings', 'User Management', 'Task Management']
     }
 
-    # Merge database settings with defaults
-    for key, default_value in defaults.items():
-        if key not in settings:
-            settings[key] = default_value
-            AppSettings.set_setting(key, default_value)
+    # Merge database settings with defaults, persisting whatever is missing
+    # in a single batched write
+    missing = {key: value for key, value in defaults.items() if key not in settings}
+    if 'custom_columns' not in settings:
+        missing['custom_columns'] = []
+    settings.update(missing)
+    AppSettings.set_many(missing)
 
     # Ensure custom_columns is properly formatted
-    if 'custom_columns' not in settings:
-        settings['custom_columns'] = []
-        AppSettings.set_setting('custom_columns', [])
-    elif isinstance(settings['custom_columns'], list):
+    if isinstance(settings['custom_columns'], list):
         settings['custom_columns'] = [
             {"name": col, "type": "text"} if isinstance(col, str) else col
             for col in settings['custom_columns']
         ]
 
+    _settings_cache['data'] = settings
     return settings
 
 # Save settings to database
@@ -457,55 +611,35 @@ def save_settings(data):
             for col in data['custom_columns']
         ]
 
-    # Save each setting to database
-    for key, value in data.items():
-        AppSettings.set_setting(key, value)
+    # Save all settings in one batch
+    AppSettings.set_many(data)
+
+    _invalidate_settings_cache()
 
 # Load tasks view
 @app.route('/')
 @login_required
 def index():
-    tasks = load_tasks()
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+    tasks, has_next = load_tasks(page=page)
     settings = load_settings()
-    summary = {
-        'completed': sum(1 for t in tasks if t.get('Status') == 'Completed'),
-        'in_progress': sum(1 for t in tasks if t.get('Status') == 'In Progress'),
-        'overdue': sum(1 for t in tasks if t.get('is_overdue')),
-        'total': len(tasks)
-    }
-
-    # Enhanced standup metrics
-    from datetime import datetime, timedelta
-    today = datetime.today().date()
-    week_ago = today - timedelta(days=7)
+    summary = _index_summary()
 
-    standup_metrics = {
-        'completed_this_week': sum(1 for t in tasks if t.get('Status') == 'Completed' and t.get('Created Date') and
-                                   parse_date_flexible(t.get('Created Date')) and
-                                   parse_date_flexible(t.get('Created Date')) >= week_ago),
-        'overdue_tasks': [t for t in tasks if t.get('is_overdue') and t.get('Status') != 'Completed'],
-        'high_priority_open': sum(1 for t in tasks if t.get('Priority') in ['High', 'Critical'] and t.get('Status') != 'Completed'),
-        'tasks_by_category': {}
-    }
+    # Standup metrics cover the whole task set, not just the rendered
+    # page, so they come from aggregate queries rather than the list
+    standup_metrics = _standup_metrics()
 
-    # Group tasks by category for standup
-    for task in tasks:
-        category = task.get('Category', 'Uncategorized')
-        if category not in standup_metrics['tasks_by_category']:
-            standup_metrics['tasks_by_category'][category] = {'total': 0, 'completed': 0, 'in_progress': 0}
-        standup_metrics['tasks_by_category'][category]['total'] += 1
-        if task.get('Status') == 'Completed':
-            standup_metrics['tasks_by_category'][category]['completed'] += 1
-        elif task.get('Status') == 'In Progress':
-            standup_metrics['tasks_by_category'][category]['in_progress'] += 1
-
-    return render_template('index.html', tasks=tasks, settings=settings, summary=summary, standup_metrics=standup_metrics)
+    return render_template('index.html', tasks=tasks, settings=settings, summary=summary,
+                           standup_metrics=standup_metrics, page=page, has_next=has_next)
 
 # Archived tasks view
 @app.route('/archived')
+@login_required
 def archived():
-    tasks = load_archived_tasks()
-    return render_template('archived.html', tasks=tasks)
+    return render_template('archived.html', tasks=iter_archived_tasks())
 
 # Add new task
 @app.route('/add_task', methods=['POST'])
@@ -514,30 +648,52 @@ def add_new_task():
     add_task(data)
     return jsonify({'status': 'success'})
 
+class _Echo:
+    """File-like whose write() returns its argument, so csv.writer can
+    format rows for a streaming response without any buffer"""
+    def write(self, value):
+        return value
+
 # Export to CSV
 @app.route('/export_csv')
+@login_required
 def export_csv():
-    tasks = load_tasks()
-    if not tasks:
+    # Stream rows straight from the database instead of building the
+    # whole CSV in memory first
+    task_iter = iter_tasks(batch_size=500)
+    first = next(task_iter, None)
+    if first is None:
         return "No data to export", 400
 
-    headers = tasks[0].keys()
-    text_stream = StringIO()
-    writer = csv.DictWriter(text_stream, fieldnames=headers)
-    writer.writeheader()
-    writer.writerows(tasks)
+    headers = list(first.keys())
+    writer = csv.writer(_Echo())
 
-    output = BytesIO()
-    output.write(text_stream.getvalue().encode('utf-8'))
-    output.seek(0)
+    def generate():
+        yield writer.writerow(headers)
+        yield writer.writerow([first.get(h, '') for h in headers])
+        for task in task_iter:
+            yield writer.writerow([task.get(h, '') for h in headers])
 
-    return send_file(
-        output,
+    return Response(
+        stream_with_context(generate()),
         mimetype='text/csv',
-        download_name='tasks_export.csv',
-        as_attachment=True
+        headers={'Content-Disposition': 'attachment; filename=tasks_export.csv'}
     )
 
+def _iter_csv_rows(file):
+    """Yield CSV rows as dicts. Uses pandas' C parser when it is installed
+    (much faster tokenization on big files); otherwise falls back to the
+    stdlib csv module."""
+    try:
+        import pandas as pd
+    except ImportError:
+        csv_data = file.read().decode('utf-8').splitlines()
+        yield from csv.DictReader(csv_data)
+        return
+
+    df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    yield from df.to_dict('records')
+
 # Import from CSV
 @app.route('/import_csv', methods=['POST'])
 def import_csv():
@@ -545,34 +701,52 @@ def import_csv():
     if not file or not file.filename.endswith('.csv'):
         return jsonify({'status': 'error', 'message': 'Invalid file format'})
 
-    csv_data = file.read().decode('utf-8').splitlines()
-    reader = csv.DictReader(csv_data)
-
-    # Clear existing tasks
-    Task.query.delete()
+    reader = _iter_csv_rows(file)
+
+    # Clear the current user's existing tasks - committed together with the
+    # inserts below so a failed import cannot leave the list half-replaced.
+    # History rows go first: on SQLite (no FK pragma, so no cascade) orphans
+    # would otherwise re-attach to re-imported task ids
+    user_task_ids = select(Task.id).where(Task.user_id == current_user.id)
+    TaskActionHistory.query.filter(
+        TaskActionHistory.task_id.in_(user_task_ids)
+    ).delete(synchronize_session=False)
+    Task.query.filter_by(user_id=current_user.id).delete()
+
+    def row_mapping(row):
+        return {
+            'id': row.get('ID', '').strip(),
+            'type': row.get('Type'),
+            'product': row.get('Product'),
+            'module': row.get('Module'),
+            'description': row.get('Description'),
+            'status': row.get('Status', 'Not Started'),
+            'priority': row.get('Priority'),
+            'created_date': parse_date_flexible(row.get('Created Date')),
+            'due_date': parse_date_flexible(row.get('Due Date')),
+            'status_update_date': parse_date_flexible(row.get('Status Update Date')),
+            'action_plan_status': row.get('Action Plan Status'),
+            'current_action_plan': row.get('Current Action Plan'),
+            'action_plan_history': row.get('Action Plan History'),
+            'category': row.get('Category'),
+            'user_id': current_user.id,
+        }
+
+    # Bulk-insert in chunks - no per-row ORM instances or unit-of-work
+    # bookkeeping, and memory stays bounded for large files. Each chunk is
+    # flushed to the database but the transaction commits once at the end.
+    mappings = (row_mapping(row) for row in reader)
+    while True:
+        chunk = list(itertools.islice(mappings, 1000))
+        if not chunk:
+            break
+        db.session.bulk_insert_mappings(Task, chunk)
     db.session.commit()
-
-    # Import new tasks from CSV
-    for row in reader:
-        task = Task(
-            id=row.get('ID', '').strip(),
-            type=row.get('Type'),
-            product=row.get('Product'),
-            module=row.get('Module'),
-            description=row.get('Description'),
-            status=row.get('Status', 'Not Started'),
-            priority=row.get('Priority'),
-            created_date=parse_date_flexible(row.get('Created Date')),
-            due_date=parse_date_flexible(row.get('Due Date')),
-            status_update_date=parse_date_flexible(row.get('Status Update Date')),
-            action_plan_status=row.get('Action Plan Status'),
-            current_action_plan=row.get('Current Action Plan'),
-            action_plan_history=row.get('Action Plan History'),
-            category=row.get('Category')
-        )
-        db.session.add(task)
-
+    # Imported rows may carry arbitrary T-numbers; drop the counter so the
+    # next add_task re-seeds from the new maximum
+    AppSettings.query.filter_by(key='next_task_seq').delete()
     db.session.commit()
+    _invalidate_analytics_cache()
     return jsonify({'status': 'success'})
 
 # Settings page view
@@ -595,6 +769,7 @@ def restore_task():
     if task:
         task.status = "Not Started"
         db.session.commit()
+        _invalidate_analytics_cache(task.user_id)
         return jsonify({'status': 'success'})
 
     return jsonify({'status': 'error', 'message': 'Task not found or not deleted'})
@@ -611,8 +786,7 @@ def edit_task():
     if not task:
         return jsonify({'status': 'error', 'message': 'Task not found'}), 404
 
-    settings = load_settings()
-    custom_columns = [col['name'] for col in settings.get('custom_columns', [])]
+    custom_columns = custom_column_names()
 
     # Update standard fields
     if 'Type' in data:
@@ -646,249 +820,264 @@ def edit_task():
     if 'Business Unit' in data:
         task.business_unit = data['Business Unit']
 
-    # Update custom fields
-    if not task.custom_fields:
-        task.custom_fields = {}
-
-    for col in custom_columns:
-        if col in data:
-            task.custom_fields[col] = data[col]
+    # Update custom fields - assign a fresh dict so SQLAlchemy sees one
+    # clean change; in-place edits on a plain JSON column are not tracked
+    # and were silently dropped
+    updates = {col: data[col] for col in custom_columns if col in data}
+    if updates:
+        custom_fields = dict(task.custom_fields or {})
+        custom_fields.update(updates)
+        task.custom_fields = custom_fields
 
     db.session.commit()
+    _invalidate_analytics_cache(current_user.id)
     return jsonify({'status': 'success'})
 
-# Analytics page
-@app.route('/analytics')
-def analytics():
-    tasks = load_tasks()
+# Short-lived per-user cache of computed analytics: {user_id: (expires_at, data)}
+_analytics_cache = {}
+_ANALYTICS_CACHE_TTL = 60  # seconds
+
+def _invalidate_analytics_cache(user_id=None):
+    """Drop cached analytics after a task mutation"""
+    if user_id is None:
+        _analytics_cache.clear()
+    else:
+        _analytics_cache.pop(user_id, None)
+
+# Dimensions the analytics views group tasks by: (analytics key, model column)
+ANALYTICS_DIMENSIONS = (
+    ('tasks_by_type', Task.type),
+    ('tasks_by_category', Task.category),
+    ('tasks_by_product', Task.product),
+    ('tasks_by_module', Task.module),
+    ('tasks_by_priority', Task.priority),
+)
+
+def _active_tasks_query(query):
+    """Scope a query to the current user's non-deleted tasks"""
+    return query.filter(Task.user_id == current_user.id, Task.status != 'Deleted')
+
+def _status_counts():
+    """Count the current user's active tasks per status, in the database"""
+    return dict(_active_tasks_query(
+        db.session.query(Task.status, func.count())
+    ).group_by(Task.status).all())
+
+def _overdue_count():
+    """Count the current user's open overdue tasks, in the database"""
+    return _active_tasks_query(
+        db.session.query(func.count())
+    ).filter(Task.is_overdue).scalar() or 0
+
+def _standup_metrics():
+    """Standup figures for the current user, aggregated in the database
+    so they stay correct however many task rows the page renders"""
+    today = datetime.today().date()
+    week_ago = today - timedelta(days=7)
+    completed_this_week = _active_tasks_query(db.session.query(func.count())).filter(
+        Task.status == 'Completed', Task.created_date >= week_ago).scalar() or 0
+    high_priority_open = _active_tasks_query(db.session.query(func.count())).filter(
+        Task.status != 'Completed', Task.priority.in_(('High', 'Critical'))).scalar() or 0
+    overdue_tasks = [task.to_dict(today) for task in _active_tasks_query(
+        Task.query.options(selectinload(Task.history_entries))
+    ).filter(Task.is_overdue)]
+
+    rows = _active_tasks_query(db.session.query(
+        Task.category,
+        func.count(),
+        func.sum(case((Task.status == 'Completed', 1), else_=0)),
+        func.sum(case((Task.status == 'In Progress', 1), else_=0)),
+    )).group_by(Task.category).all()
+    tasks_by_category = {
+        (category or 'Uncategorized'): {'total': total,
+                                        'completed': completed or 0,
+                                        'in_progress': in_progress or 0}
+        for category, total, completed, in_progress in rows}
+
+    return {
+        'completed_this_week': completed_this_week,
+        'overdue_tasks': overdue_tasks,
+        'high_priority_open': high_priority_open,
+        'tasks_by_category': tasks_by_category
+    }
+
+def _index_summary():
+    """The four index summary figures in one aggregate query - four
+    scalars come back instead of two round-trips of grouped rows"""
+    row = _active_tasks_query(db.session.query(
+        func.count(),
+        func.sum(case((Task.status == 'Completed', 1), else_=0)),
+        func.sum(case((Task.status == 'In Progress', 1), else_=0)),
+        func.sum(case((Task.is_overdue, 1), else_=0)),
+    )).one()
+    return {
+        'total': row[0] or 0,
+        'completed': row[1] or 0,
+        'in_progress': row[2] or 0,
+        'overdue': row[3] or 0,
+    }
+
+def _grouped_counts(column):
+    """Total/completed counts per distinct value of `column` via GROUP BY"""
+    rows = _active_tasks_query(db.session.query(
+        column,
+        func.count(),
+        func.sum(case((Task.status == 'Completed', 1), else_=0))
+    )).group_by(column).all()
+    return {value: {'total': total, 'completed': int(completed or 0)}
+            for value, total, completed in rows}
+
+def _pct(part, whole):
+    """part/whole as a percentage with one decimal place, computed in
+    integer math (round half up) - counts stay integers until the final
+    tenths conversion, so no float division or round() dispatch"""
+    return (part * 1000 + whole // 2) // whole / 10.0
+
+def _compute_analytics():
+    """Analytics aggregates for the current user - shared by /analytics and
+    /export_analytics, served from the short per-user cache when fresh"""
+    cached = _analytics_cache.get(current_user.id)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
+    # All aggregation happens in the database - no task rows are loaded
+    status_counts = _status_counts()
+    total_tasks = sum(status_counts.values())
 
-    # Calculate analytics data
     analytics_data = {
-        'total_tasks': len(tasks),
-        'completed_tasks': sum(1 for t in tasks if t.get('Status') == 'Completed'),
-        'in_progress_tasks': sum(1 for t in tasks if t.get('Status') == 'In Progress'),
-        'not_started_tasks': sum(1 for t in tasks if t.get('Status') == 'Not Started'),
-        'on_hold_tasks': sum(1 for t in tasks if t.get('Status') == 'On Hold'),
-        'overdue_tasks': sum(1 for t in tasks if t.get('is_overdue')),
-        'tasks_by_type': {},
-        'tasks_by_category': {},
-        'tasks_by_product': {},
-        'tasks_by_module': {},
-        'tasks_by_priority': {},
+        'total_tasks': total_tasks,
+        'completed_tasks': status_counts.get('Completed', 0),
+        'in_progress_tasks': status_counts.get('In Progress', 0),
+        'not_started_tasks': status_counts.get('Not Started', 0),
+        'on_hold_tasks': status_counts.get('On Hold', 0),
+        'overdue_tasks': _overdue_count(),
         'completion_trend': {},
         'productivity_trend': {},
         'weekly_stats': {}
     }
-
-    # Group tasks by various dimensions
-    for task in tasks:
-        # By Type
-        task_type = task.get('Type', 'Unknown')
-        if task_type not in analytics_data['tasks_by_type']:
-            analytics_data['tasks_by_type'][task_type] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_type'][task_type]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_type'][task_type]['completed'] += 1
-
-        # By Category
-        category = task.get('Category', 'Unknown')
-        if category not in analytics_data['tasks_by_category']:
-            analytics_data['tasks_by_category'][category] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_category'][category]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_category'][category]['completed'] += 1
-
-        # By Product
-        product = task.get('Product', 'Unknown')
-        if product not in analytics_data['tasks_by_product']:
-            analytics_data['tasks_by_product'][product] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_product'][product]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_product'][product]['completed'] += 1
-
-        # By Module
-        module = task.get('Module', 'Unknown')
-        if module not in analytics_data['tasks_by_module']:
-            analytics_data['tasks_by_module'][module] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_module'][module]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_module'][module]['completed'] += 1
-
-        # By Priority
-        priority = task.get('Priority', 'Unknown')
-        if priority not in analytics_data['tasks_by_priority']:
-            analytics_data['tasks_by_priority'][priority] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_priority'][priority]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_priority'][priority]['completed'] += 1
-
-        # Completion trend by date
-        created_date = task.get('Created Date', '')
-        if created_date and task.get('Status') == 'Completed':
-            if created_date not in analytics_data['completion_trend']:
-                analytics_data['completion_trend'][created_date] = 0
-            analytics_data['completion_trend'][created_date] += 1
+    for key, column in ANALYTICS_DIMENSIONS:
+        analytics_data[key] = _grouped_counts(column)
+
+    # Completion trend by created date
+    trend_rows = _active_tasks_query(
+        db.session.query(Task.created_date, func.count())
+    ).filter(Task.status == 'Completed').group_by(Task.created_date).all()
+    analytics_data['completion_trend'] = {
+        created.isoformat(): count for created, count in trend_rows if created
+    }
 
     # Calculate completion rates
-    for key in ['tasks_by_type', 'tasks_by_category', 'tasks_by_product', 'tasks_by_module', 'tasks_by_priority']:
+    for key, _ in ANALYTICS_DIMENSIONS:
         for item_key, item_data in analytics_data[key].items():
             if item_data['total'] > 0:
-                item_data['completion_rate'] = round((item_data['completed'] / item_data['total']) * 100, 1)
+                item_data['completion_rate'] = _pct(item_data['completed'], item_data['total'])
             else:
                 item_data['completion_rate'] = 0
 
     # Calculate overall completion rate
     analytics_data['overall_completion_rate'] = 0
     if analytics_data['total_tasks'] > 0:
-        analytics_data['overall_completion_rate'] = round((analytics_data['completed_tasks'] / analytics_data['total_tasks']) * 100, 1)
+        analytics_data['overall_completion_rate'] = _pct(
+            analytics_data['completed_tasks'], analytics_data['total_tasks'])
 
     # Calculate average tasks per day (last 30 days)
-    from datetime import datetime, timedelta
     thirty_days_ago = datetime.now().date() - timedelta(days=30)
-    recent_tasks = [t for t in tasks if t.get('Created Date') and
-                   parse_date_flexible(t.get('Created Date')) and
-                   parse_date_flexible(t.get('Created Date')) >= thirty_days_ago]
+    recent_count = _active_tasks_query(
+        db.session.query(func.count())
+    ).filter(Task.created_date >= thirty_days_ago).scalar() or 0
 
-    analytics_data['avg_tasks_per_day'] = round(len(recent_tasks) / 30, 1) if recent_tasks else 0
+    analytics_data['avg_tasks_per_day'] = round(recent_count / 30, 1) if recent_count else 0
 
-    return render_template('analytics.html', analytics=analytics_data)
+    _analytics_cache[current_user.id] = (time.time() + _ANALYTICS_CACHE_TTL, analytics_data)
+    return analytics_data
+
+# Analytics page
+@app.route('/analytics')
+@login_required
+def analytics():
+    return render_template('analytics.html', analytics=_compute_analytics())
 
 # Export analytics report
 @app.route('/export_analytics')
+@login_required
 def export_analytics():
-    tasks = load_tasks()
-
-    # Calculate analytics data (same as analytics route)
-    analytics_data = {
-        'total_tasks': len(tasks),
-        'completed_tasks': sum(1 for t in tasks if t.get('Status') == 'Completed'),
-        'in_progress_tasks': sum(1 for t in tasks if t.get('Status') == 'In Progress'),
-        'not_started_tasks': sum(1 for t in tasks if t.get('Status') == 'Not Started'),
-        'on_hold_tasks': sum(1 for t in tasks if t.get('Status') == 'On Hold'),
-        'overdue_tasks': sum(1 for t in tasks if t.get('is_overdue')),
-        'tasks_by_type': {},
-        'tasks_by_category': {},
-        'tasks_by_product': {},
-        'tasks_by_module': {},
-        'tasks_by_priority': {},
-    }
-
-    # Group tasks by various dimensions
-    for task in tasks:
-        # By Type
-        task_type = task.get('Type', 'Unknown')
-        if task_type not in analytics_data['tasks_by_type']:
-            analytics_data['tasks_by_type'][task_type] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_type'][task_type]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_type'][task_type]['completed'] += 1
-
-        # By Product
-        product = task.get('Product', 'Unknown')
-        if product not in analytics_data['tasks_by_product']:
-            analytics_data['tasks_by_product'][product] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_product'][product]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_product'][product]['completed'] += 1
-
-        # By Module
-        module = task.get('Module', 'Unknown')
-        if module not in analytics_data['tasks_by_module']:
-            analytics_data['tasks_by_module'][module] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_module'][module]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_module'][module]['completed'] += 1
-
-        # By Priority
-        priority = task.get('Priority', 'Unknown')
-        if priority not in analytics_data['tasks_by_priority']:
-            analytics_data['tasks_by_priority'][priority] = {'total': 0, 'completed': 0}
-        analytics_data['tasks_by_priority'][priority]['total'] += 1
-        if task.get('Status') == 'Completed':
-            analytics_data['tasks_by_priority'][priority]['completed'] += 1
-
-    # Calculate completion rates
-    for key in ['tasks_by_type', 'tasks_by_product', 'tasks_by_module', 'tasks_by_priority']:
-        for item_key, item_data in analytics_data[key].items():
-            if item_data['total'] > 0:
-                item_data['completion_rate'] = round((item_data['completed'] / item_data['total']) * 100, 1)
-            else:
-                item_data['completion_rate'] = 0
+    # Same aggregates as the analytics page - computed once, shared
+    analytics_data = _compute_analytics()
+
+    # Assemble every section as plain row lists; the generator below
+    # formats them one at a time so nothing is buffered server-side
+    rows = [
+        ['ProgressPad Analytics Report'],
+        ['Generated on', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+        [],
+        ['SUMMARY METRICS'],
+        ['Metric', 'Value'],
+        ['Total Tasks', analytics_data['total_tasks']],
+        ['Completed Tasks', analytics_data['completed_tasks']],
+        ['In Progress Tasks', analytics_data['in_progress_tasks']],
+        ['Not Started Tasks', analytics_data['not_started_tasks']],
+        ['On Hold Tasks', analytics_data['on_hold_tasks']],
+        ['Overdue Tasks', analytics_data['overdue_tasks']],
+        ['Overall Completion Rate (%)', analytics_data['overall_completion_rate']],
+        [],
+    ]
 
-    # Create CSV content
-    import csv
-    from io import StringIO
-
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Write header
-    writer.writerow(['ProgressPad Analytics Report'])
-    writer.writerow(['Generated on', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-    writer.writerow([])
-
-    # Write summary metrics
-    writer.writerow(['SUMMARY METRICS'])
-    writer.writerow(['Metric', 'Value'])
-    writer.writerow(['Total Tasks', analytics_data['total_tasks']])
-    writer.writerow(['Completed Tasks', analytics_data['completed_tasks']])
-    writer.writerow(['In Progress Tasks', analytics_data['in_progress_tasks']])
-    writer.writerow(['Not Started Tasks', analytics_data['not_started_tasks']])
-    writer.writerow(['On Hold Tasks', analytics_data['on_hold_tasks']])
-    writer.writerow(['Overdue Tasks', analytics_data['overdue_tasks']])
-    writer.writerow(['Overall Completion Rate (%)', f"{round((analytics_data['completed_tasks'] / max(analytics_data['total_tasks'], 1)) * 100, 1)}"])
-    writer.writerow([])
-
-    # Write product performance
-    writer.writerow(['PRODUCT PERFORMANCE'])
-    writer.writerow(['Product', 'Total Tasks', 'Completed', 'Completion Rate (%)'])
-    for product, data in analytics_data['tasks_by_product'].items():
-        writer.writerow([product, data['total'], data['completed'], data['completion_rate']])
-    writer.writerow([])
-
-    # Write module performance
-    writer.writerow(['MODULE PERFORMANCE'])
-    writer.writerow(['Module', 'Total Tasks', 'Completed', 'Completion Rate (%)'])
-    for module, data in analytics_data['tasks_by_module'].items():
-        writer.writerow([module, data['total'], data['completed'], data['completion_rate']])
-    writer.writerow([])
-
-    # Write priority distribution
-    writer.writerow(['PRIORITY DISTRIBUTION'])
-    writer.writerow(['Priority', 'Total Tasks', 'Completed', 'Completion Rate (%)'])
-    for priority, data in analytics_data['tasks_by_priority'].items():
-        writer.writerow([priority, data['total'], data['completed'], data['completion_rate']])
-    writer.writerow([])
-
-    # Write task types
-    writer.writerow(['TASK TYPES'])
-    writer.writerow(['Type', 'Total Tasks', 'Completed', 'Completion Rate (%)'])
-    for task_type, data in analytics_data['tasks_by_type'].items():
-        writer.writerow([task_type, data['total'], data['completed'], data['completion_rate']])
-
-    # Prepare response
-    output.seek(0)
-    return send_file(
-        BytesIO(output.getvalue().encode('utf-8')),
+    sections = (
+        ('PRODUCT PERFORMANCE', 'Product', 'tasks_by_product'),
+        ('MODULE PERFORMANCE', 'Module', 'tasks_by_module'),
+        ('PRIORITY DISTRIBUTION', 'Priority', 'tasks_by_priority'),
+        ('TASK TYPES', 'Type', 'tasks_by_type'),
+    )
+    for title, label, key in sections:
+        rows.append([title])
+        rows.append([label, 'Total Tasks', 'Completed', 'Completion Rate (%)'])
+        rows.extend([item, data['total'], data['completed'], data['completion_rate']]
+                    for item, data in analytics_data[key].items())
+        rows.append([])
+    rows.pop()  # no trailing blank line after the last section
+
+    # Stream rows straight into the response instead of building the
+    # whole report in a StringIO and copying it into a BytesIO
+    writer = csv.writer(_Echo())
+
+    def generate():
+        for row in rows:
+            yield writer.writerow(row)
+
+    filename = f'ProgressPad_Analytics_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return Response(
+        stream_with_context(generate()),
         mimetype='text/csv',
-        download_name=f'ProgressPad_Analytics_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-        as_attachment=True
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
+# Last successful health probe - load balancers hit /health every few
+# seconds, so reuse a recent result instead of pinging the DB every time
+_health_cache = {'ts': 0.0, 'response': None}
+_HEALTH_CACHE_TTL = 5  # seconds
+
 # Health check endpoint for Railway
 @app.route('/health')
 def health_check():
     """Health check endpoint for deployment monitoring"""
+    now = time.time()
+    if _health_cache['response'] is not None and now - _health_cache['ts'] < _HEALTH_CACHE_TTL:
+        return jsonify(_health_cache['response'])
+
     try:
         # Test database connection
         db.session.execute(db.text('SELECT 1'))
-        return jsonify({
+        payload = {
             'status': 'healthy',
             'database': 'connected',
             'database_url': app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')[:50] + '...',
             'timestamp': datetime.utcnow().isoformat()
-        })
+        }
+        _health_cache['ts'] = now
+        _health_cache['response'] = payload
+        return jsonify(payload)
     except Exception as e:
+        _health_cache['response'] = None
         return jsonify({
             'status': 'unhealthy',
             'database': 'disconnected',
@@ -903,19 +1092,31 @@ def debug_database():
     """Debug endpoint to check database status"""
     try:
         # Check if tables exist
-        from sqlalchemy import inspect
         inspector = inspect(db.engine)
         tables = inspector.get_table_names()
 
-        # Check counts
-        task_count = Task.query.count()
-        user_count = User.query.count()
+        # Counts: planner estimates by default on PostgreSQL (an O(1)
+        # catalog read instead of a full COUNT(*) scan); pass ?exact=1
+        # for the real numbers. SQLite always counts exactly.
+        exact = request.args.get('exact') == '1'
+        if not exact and db.engine.dialect.name == 'postgresql':
+            counts_key = 'approx'
+            task_count, user_count = (
+                db.session.execute(text(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = :t"
+                ), {'t': table}).scalar() or 0
+                for table in ('tasks', 'users'))
+        else:
+            counts_key = 'exact'
+            task_count = Task.query.count()
+            user_count = User.query.count()
 
         return jsonify({
             'database_connected': True,
             'tables': tables,
             'task_count': task_count,
             'user_count': user_count,
+            'count_mode': counts_key,
             'database_url': app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')[:50] + '...',
             'has_tasks_table': 'tasks' in tables,
             'has_users_table': 'users' in tables,
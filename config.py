@@ -36,6 +36,19 @@ class ProductionConfig(Config):
     DEBUG = False
     # Railway provides DATABASE_URL automatically
 
+    # Explicit pool sizing for PostgreSQL - the default pool of 5 queues
+    # requests once probes, analytics and list traffic overlap. LIFO
+    # checkout reuses the hottest connections, and the statement timeout
+    # keeps a runaway query from starving the pool.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': 20,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_use_lifo': True,
+        'connect_args': {'options': '-c statement_timeout=30000'},
+    }
+
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///tasks_test.db'
@@ -1,11 +1,22 @@
+import functools
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+from datetime import datetime, date
+from sqlalchemy import Index, text, and_, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.dialects.postgresql import JSON
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+@functools.lru_cache(maxsize=8192)
+def _iso(ordinal):
+    """ISO string for a date ordinal. Task dates cluster on a small set of
+    days, so caching by ordinal returns one shared string per distinct date
+    instead of allocating a fresh one per row during bulk conversion."""
+    return date.fromordinal(ordinal).isoformat()
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
@@ -16,8 +27,10 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_admin = db.Column(db.Boolean, default=False)
 
-    # Relationship with tasks
-    tasks = db.relationship('Task', backref='user', lazy=True)
+    # Relationship with tasks - deletion is handled by the database via
+    # ON DELETE CASCADE, so don't load children just to delete them
+    tasks = db.relationship('Task', backref='user', lazy=True,
+                            passive_deletes=True)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -30,6 +43,23 @@ class User(UserMixin, db.Model):
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Every view filters on status (!= 'Deleted' or == 'Deleted') and
+        # analytics ranges over created_date within a status
+        Index('ix_tasks_status', 'status'),
+        Index('ix_tasks_status_created', 'status', 'created_date'),
+        # Composite indexes backing the per-user GROUP BY / COUNT queries
+        # and the per-user created_date windows (analytics trend, 30-day avg)
+        Index('ix_tasks_user_status', 'user_id', 'status'),
+        Index('ix_tasks_user_created', 'user_id', 'created_date'),
+        # Partial index for the hot "active tasks" predicate (PostgreSQL only)
+        Index('ix_tasks_active', 'id',
+              postgresql_where=text("status <> 'Deleted'")),
+        # Partial index matching the overdue predicate (is_overdue filters
+        # on status != 'Completed' before comparing due_date)
+        Index('ix_tasks_due_open', 'due_date',
+              postgresql_where=text("status <> 'Completed'")),
+    )
 
     id = db.Column(db.String(10), primary_key=True)
     type = db.Column(db.String(50))
@@ -49,7 +79,9 @@ class Task(db.Model):
     business_unit = db.Column(db.String(100))  # New field: Business Unit
 
     # User relationship
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer,
+                        db.ForeignKey('users.id', ondelete='CASCADE'),
+                        nullable=False)
 
     # Custom columns stored as JSON for flexibility
     custom_fields = db.Column(JSON, default=dict)
@@ -58,29 +90,77 @@ class Task(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        """Convert task to dictionary format compatible with existing code"""
-        result = {
-            'ID': self.id,
-            'Type': self.type,
-            'Product': self.product,
-            'Module': self.module,
-            'Description': self.description,
-            'Status': self.status,
-            'Priority': self.priority,
-            'Created Date': self.created_date.isoformat() if self.created_date else None,
-            'Due Date': self.due_date.isoformat() if self.due_date else None,
-            'Status Update Date': self.status_update_date.isoformat() if self.status_update_date else None,
-            'Action Plan Status': self.action_plan_status,
-            'Current Action Plan': self.current_action_plan,
-            'Action Plan History': self.action_plan_history,
-            'Category': self.category,
-            'Requester': self.requester,
-            'Business Unit': self.business_unit,
-            'is_overdue': False,
-            'due_soon': False,
-            'due_today': False
-        }
+    # Append-only action plan history rows, newest first. The legacy
+    # action_plan_history TEXT column is kept for rows written before the
+    # history table existed and is appended after the structured entries.
+    history_entries = db.relationship(
+        'TaskActionHistory', backref='task', lazy=True,
+        passive_deletes=True, order_by='desc(TaskActionHistory.id)')
+
+    def rendered_history(self):
+        """Action plan history in the legacy concatenated-text format:
+        newest entries first, legacy blob (if any) at the end"""
+        parts = []
+        for entry in self.history_entries:
+            stamp = entry.created_at.date().isoformat()
+            label = f"STANDUP {stamp}" if entry.kind == 'standup' else stamp
+            parts.append(f"[{label}]\n{entry.entry}")
+        if self.action_plan_history:
+            parts.append(self.action_plan_history)
+        return '\n\n'.join(parts)
+
+    @hybrid_property
+    def is_overdue(self):
+        """Open task whose due date has passed"""
+        return (self.due_date is not None
+                and self.status != 'Completed'
+                and self.due_date < datetime.today().date())
+
+    @is_overdue.expression
+    def is_overdue(cls):
+        # SQL form so overdue counts can be evaluated by the database
+        return and_(cls.due_date.isnot(None),
+                    cls.status != 'Completed',
+                    cls.due_date < func.current_date())
+
+    # Base shape for to_dict results - copied and filled in per row.
+    # Copying one prebuilt dict is cheaper than rebuilding the 19-key
+    # literal on every conversion.
+    _DICT_TEMPLATE = {
+        'ID': None, 'Type': None, 'Product': None, 'Module': None,
+        'Description': None, 'Status': None, 'Priority': None,
+        'Created Date': None, 'Due Date': None, 'Status Update Date': None,
+        'Action Plan Status': None, 'Current Action Plan': None,
+        'Action Plan History': None, 'Category': None, 'Requester': None,
+        'Business Unit': None,
+        'is_overdue': False, 'due_soon': False, 'due_today': False,
+    }
+
+    def to_dict(self, today=None):
+        """Convert task to dictionary format compatible with existing code.
+
+        Callers converting many rows should compute today's date once and
+        pass it in, instead of paying a datetime construction per row."""
+        result = self._DICT_TEMPLATE.copy()
+        result['ID'] = self.id
+        result['Type'] = self.type
+        result['Product'] = self.product
+        result['Module'] = self.module
+        result['Description'] = self.description
+        result['Status'] = self.status
+        result['Priority'] = self.priority
+        if self.created_date:
+            result['Created Date'] = _iso(self.created_date.toordinal())
+        if self.due_date:
+            result['Due Date'] = _iso(self.due_date.toordinal())
+        if self.status_update_date:
+            result['Status Update Date'] = _iso(self.status_update_date.toordinal())
+        result['Action Plan Status'] = self.action_plan_status
+        result['Current Action Plan'] = self.current_action_plan
+        result['Action Plan History'] = self.rendered_history()
+        result['Category'] = self.category
+        result['Requester'] = self.requester
+        result['Business Unit'] = self.business_unit
 
         # Add custom fields
         if self.custom_fields:
@@ -88,7 +168,8 @@ class Task(db.Model):
 
         # Calculate date-based flags
         if self.due_date and self.status != 'Completed':
-            today = datetime.today().date()
+            if today is None:
+                today = datetime.today().date()
             if self.due_date < today:
                 result['is_overdue'] = True
             elif self.due_date == today:
@@ -98,6 +179,19 @@ class Task(db.Model):
 
         return result
 
+class TaskActionHistory(db.Model):
+    """One action-plan history entry. Updates append a single row here
+    instead of rewriting the whole history text on the task."""
+    __tablename__ = 'task_action_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.String(10),
+                        db.ForeignKey('tasks.id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    entry = db.Column(db.Text, nullable=False)
+    kind = db.Column(db.String(10), default='normal')  # 'normal' | 'standup'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class AppSettings(db.Model):
     __tablename__ = 'app_settings'
 
@@ -109,11 +203,25 @@ class AppSettings(db.Model):
 
     @staticmethod
     def get_settings():
-        """Get all settings as a dictionary"""
-        settings = {}
-        for setting in AppSettings.query.all():
-            settings[setting.key] = setting.value
-        return settings
+        """Get all settings as a dictionary. Selects (key, value) tuples
+        rather than hydrating full ORM instances - the rows are read-only
+        here and tuple fetches skip the identity-map bookkeeping."""
+        return dict(db.session.query(AppSettings.key, AppSettings.value).all())
+
+    @staticmethod
+    def increment(key, initial=0):
+        """Atomically increment an integer counter stored as a setting and
+        return the new value. `initial` seeds the counter the first time
+        (an int, or a callable evaluated only when the row is missing)."""
+        setting = AppSettings.query.filter_by(key=key).with_for_update().first()
+        if setting is None:
+            start = initial() if callable(initial) else initial
+            setting = AppSettings(key=key, value=start + 1)
+            db.session.add(setting)
+        else:
+            setting.value = int(setting.value) + 1
+        db.session.commit()
+        return int(setting.value)
 
     @staticmethod
     def set_setting(key, value):
@@ -126,6 +234,22 @@ class AppSettings(db.Model):
             db.session.add(setting)
         db.session.commit()
 
+    @staticmethod
+    def set_many(mapping):
+        """Set several settings with one SELECT and one commit instead of a
+        round-trip per key"""
+        if not mapping:
+            return
+        existing = {s.key: s for s in
+                    AppSettings.query.filter(AppSettings.key.in_(mapping)).all()}
+        for key, value in mapping.items():
+            setting = existing.get(key)
+            if setting:
+                setting.value = value
+            else:
+                db.session.add(AppSettings(key=key, value=value))
+        db.session.commit()
+
 def create_default_admin():
     """Create a default admin user if none exists"""
     if not User.query.filter_by(username='admin').first():